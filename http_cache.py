@@ -0,0 +1,247 @@
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from requests.structures import CaseInsensitiveDict
+from typing import Optional, Literal
+import requests as req
+import hashlib
+import logging
+import pathlib
+import sqlite3
+import json
+import time
+import zlib
+
+
+# credentials must never end up in the cache keys nor in the stored responses
+SENSITIVE_PARAMS = {"code", "client_id", "client_secret", "refresh_token"}
+SENSITIVE_HEADERS = {"authorization"}
+SENSITIVE_FIELDS = {"access_token", "refresh_token"}
+# the responses are stored with only the headers needed to read them back (no Set-Cookie)
+STORED_HEADERS = {"content-type"}
+REDACTED = "REDACTED"
+
+
+def __normalize_param(key: str, value: str) -> str:
+    # the upper bound of the range is always "today", so it is dropped
+    # to let a recording be replayed on any other day
+    if key == "modifiedTimeRange":
+        return value.split(",")[0]
+
+    return value
+
+
+def normalize_request(
+        method: str,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None
+) -> str:
+    parts = urlsplit(url)
+
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += list((params or {}).items())
+    query = sorted(
+        (str(k), __normalize_param(str(k), str(v))) for k, v in query
+        if k not in SENSITIVE_PARAMS
+    )
+
+    kept_headers = sorted(
+        (str(k).lower(), str(v)) for k, v in (headers or {}).items()
+        if str(k).lower() not in SENSITIVE_HEADERS
+    )
+
+    return json.dumps([
+        method.upper(),
+        f"{parts.scheme}://{parts.netloc.lower()}{parts.path}",
+        urlencode(query),
+        kept_headers
+    ])
+
+
+def redact_tokens(content: bytes) -> bytes:
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return content
+
+    if not isinstance(data, dict):
+        return content
+
+    for field in SENSITIVE_FIELDS & data.keys():
+        data[field] = REDACTED
+
+    return json.dumps(data).encode("utf-8")
+
+
+class HttpCache:
+    def __init__(
+            self,
+            mode: Literal["record", "replay"],
+            path: str | pathlib.Path = "http_cache.sqlite",
+            latency: float = 0.0,
+            token_url: Optional[str] = None
+    ) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid mode '{mode}'. Expected 'record' or 'replay'.")
+
+        self.mode: str = mode
+        self.path = pathlib.Path(path).absolute()
+        self.latency: float = latency
+        self.token_url: Optional[str] = token_url
+        self.__memory: dict = {}
+        self.__state: dict = {}
+        self.__conn: Optional[sqlite3.Connection] = None
+
+        if mode == "replay":
+            self.__load()
+        else:
+            # every recording starts a clean store, so its responses and state always match
+            if self.path.is_file():
+                logging.warning(f"Replacing the HTTP cache at '{self.path}'")
+
+                self.path.unlink()
+
+            self.__conn = sqlite3.connect(self.path)
+            self.__conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    request TEXT NOT NULL,
+                    status_code INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    content BLOB NOT NULL
+                )"""
+            )
+            self.__conn.execute(
+                """CREATE TABLE IF NOT EXISTS state (
+                    name TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (name, key)
+                )"""
+            )
+            self.__conn.commit()
+
+    def __enter__(self) -> "HttpCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __load(self) -> None:
+        if not self.path.is_file():
+            raise FileNotFoundError(f"There is no HTTP cache to replay at '{self.path}'")
+
+        # loading everything once, so replaying never touches the disk again
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+        try:
+            for key, status_code, headers, content in conn.execute(
+                "SELECT key, status_code, headers, content FROM responses"
+            ):
+                self.__memory[key] = (status_code, json.loads(headers), zlib.decompress(content))
+
+            for name, key, value in conn.execute("SELECT name, key, value FROM state"):
+                self.__state[(name, key)] = json.loads(value)
+        finally:
+            conn.close()
+
+        logging.info(f"{len(self.__memory)} responses loaded from '{self.path}'")
+
+    @staticmethod
+    def __key(normalized: str) -> str:
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            params: Optional[dict] = None,
+            headers: Optional[dict] = None
+    ) -> req.Response:
+        normalized = normalize_request(method, url, params, headers)
+        key = self.__key(normalized)
+
+        if self.mode == "replay":
+            return self.__replay(key, normalized, url)
+
+        response = req.request(method, url=url, params=params, headers=headers)
+
+        content = response.content
+        headers = {
+            k: v for k, v in response.headers.items()
+            if k.lower() in STORED_HEADERS
+        }
+
+        if self.token_url is not None and url.startswith(self.token_url):
+            content = redact_tokens(content)
+
+        self.__conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                normalized,
+                response.status_code,
+                json.dumps(headers),
+                zlib.compress(content)
+            )
+        )
+        self.__conn.commit()
+
+        return response
+
+    def __replay(self, key: str, normalized: str, url: str) -> req.Response:
+        try:
+            status_code, headers, content = self.__memory[key]
+        except KeyError:
+            raise LookupError(f"Request not recorded in '{self.path}': {normalized}")
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        response = req.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = content
+        response.url = url
+
+        return response
+
+    def record_state(self, name: str, key: str, value: Optional[str]) -> None:
+        # only the first value is kept: it is the one the recorded requests started from
+        self.__conn.execute(
+            "INSERT OR IGNORE INTO state VALUES (?, ?, ?)",
+            (name, key, json.dumps(value))
+        )
+        self.__conn.commit()
+
+    def get_state(self, name: str, key: str) -> Optional[str]:
+        return self.__state.get((name, key))
+
+    def set_state(self, name: str, key: str, value: Optional[str]) -> None:
+        # replaying only moves the state in memory, so every replay starts from the same point
+        self.__state[(name, key)] = value
+
+    def close(self) -> None:
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+
+
+class NullS3Client:
+    # stands in for the boto3 client when replaying, so the upload stage runs without network
+    def __init__(self) -> None:
+        self.objects: int = 0
+        self.bytes: int = 0
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        self.objects += 1
+        self.bytes += len(Body)
+
+        logging.debug(f"Replay: skipping upload of '{Bucket}/{Key}'")
+
+        return {}
+
+    def upload_file(self, Filename: str | pathlib.Path, Bucket: str, Key: str) -> None:
+        self.objects += 1
+        self.bytes += pathlib.Path(Filename).stat().st_size
+
+        logging.debug(f"Replay: skipping upload of '{Bucket}/{Key}'")
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# the modules live in the repository root, not in a package
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
@@ -0,0 +1,146 @@
+import sqlite3
+import json
+import zlib
+
+import pytest
+from requests.models import Response
+
+import http_cache
+from http_cache import HttpCache, normalize_request, redact_tokens, REDACTED
+
+
+TOKEN_URL = "https://accounts.zoho.com/oauth/v2/token"
+
+
+def fake_response(content: dict, headers: dict = None) -> Response:
+    response = Response()
+    response.status_code = 200
+    response.headers = {"Content-Type": "application/json", **(headers or {})}
+    response._content = json.dumps(content).encode("utf-8")
+
+    return response
+
+
+def test_normalize_request_ignores_param_order_and_header_case():
+    a = normalize_request(
+        "get", "https://DESK.zoho.com/api/v1/tickets/search?b=2&a=1", headers={"orgId": "1"}
+    )
+    b = normalize_request(
+        "GET", "https://desk.zoho.com/api/v1/tickets/search?a=1&b=2", headers={"orgid": "1"}
+    )
+
+    assert a == b
+
+
+def test_normalize_request_drops_credentials():
+    normalized = normalize_request(
+        "POST",
+        TOKEN_URL,
+        params={
+            "refresh_token": "secret",
+            "client_id": "id",
+            "client_secret": "secret",
+            "code": "secret",
+            "grant_type": "refresh_token"
+        },
+        headers={"Authorization": "Zoho-oauthtoken secret"}
+    )
+
+    assert "secret" not in normalized
+    assert "grant_type=refresh_token" in normalized
+
+
+def test_normalize_request_drops_range_upper_bound():
+    today = normalize_request(
+        "GET", "https://desk.zoho.com/api/v1/tickets/search?modifiedTimeRange=2024-01-01T00:00:00.000Z,2026-10-19T23:59:59.999Z"
+    )
+    tomorrow = normalize_request(
+        "GET", "https://desk.zoho.com/api/v1/tickets/search?modifiedTimeRange=2024-01-01T00:00:00.000Z,2026-10-20T23:59:59.999Z"
+    )
+    other_start = normalize_request(
+        "GET", "https://desk.zoho.com/api/v1/tickets/search?modifiedTimeRange=2024-01-02T00:00:00.000Z,2026-10-19T23:59:59.999Z"
+    )
+
+    assert today == tomorrow
+    assert today != other_start
+
+
+def test_redact_tokens():
+    content = json.dumps({"access_token": "a", "refresh_token": "r", "expires_in": 3600}).encode()
+
+    assert json.loads(redact_tokens(content)) == {
+        "access_token": REDACTED,
+        "refresh_token": REDACTED,
+        "expires_in": 3600
+    }
+    assert redact_tokens(b"not json") == b"not json"
+    assert redact_tokens(b"[1, 2]") == b"[1, 2]"
+
+
+def test_record_and_replay(tmp_path, monkeypatch):
+    path = tmp_path / "cache.sqlite"
+
+    def fake_request(method, url, params=None, headers=None):
+        if url == TOKEN_URL:
+            return fake_response({"access_token": "real", "refresh_token": "real"})
+
+        return fake_response({"data": [1]}, headers={"Set-Cookie": "session=real"})
+
+    monkeypatch.setattr(http_cache.req, "request", fake_request)
+
+    with HttpCache("record", path, token_url=TOKEN_URL) as cache:
+        assert cache.request("POST", TOKEN_URL, params={"refresh_token": "real"}).json()["access_token"] == "real"
+        cache.request("GET", "https://desk.zoho.com/api/v1/tickets?b=2&a=1", headers={"Authorization": "real"})
+        cache.record_state("last_ticket", "last_ticket_downloaded_date", "2024-01-01T00:00:00.000Z")
+        cache.record_state("last_ticket", "last_ticket_downloaded_date", "2024-01-02T00:00:00.000Z")
+
+    conn = sqlite3.connect(path)
+    stored = [(json.loads(h), zlib.decompress(c)) for h, c in conn.execute("SELECT headers, content FROM responses")]
+    conn.close()
+
+    assert all(b"real" not in content for _, content in stored)
+    assert all(headers == {"Content-Type": "application/json"} for headers, _ in stored)
+
+    monkeypatch.setattr(http_cache.req, "request", None)
+    before = path.read_bytes()
+
+    cache = HttpCache("replay", path)
+
+    assert cache.request("POST", TOKEN_URL, params={"refresh_token": REDACTED}).json()["access_token"] == REDACTED
+    assert cache.request("GET", "https://desk.zoho.com/api/v1/tickets?a=1&b=2").json() == {"data": [1]}
+    assert cache.get_state("last_ticket", "last_ticket_downloaded_date") == "2024-01-01T00:00:00.000Z"
+
+    cache.set_state("last_ticket", "last_ticket_downloaded_date", "2024-01-03T00:00:00.000Z")
+
+    with pytest.raises(LookupError):
+        cache.request("GET", "https://desk.zoho.com/api/v1/tasks")
+
+    cache.close()
+
+    assert path.read_bytes() == before
+    assert HttpCache("replay", path).get_state("last_ticket", "last_ticket_downloaded_date") == "2024-01-01T00:00:00.000Z"
+
+
+def test_record_starts_a_clean_store(tmp_path, monkeypatch):
+    path = tmp_path / "cache.sqlite"
+
+    monkeypatch.setattr(http_cache.req, "request", lambda *args, **kwargs: fake_response({}))
+
+    with HttpCache("record", path) as cache:
+        cache.request("GET", "https://desk.zoho.com/api/v1/tickets")
+        cache.record_state("last_ticket", "last_ticket_downloaded_date", "2024-01-01T00:00:00.000Z")
+
+    with HttpCache("record", path) as cache:
+        cache.record_state("last_ticket", "last_ticket_downloaded_date", "2024-01-05T00:00:00.000Z")
+
+    cache = HttpCache("replay", path)
+
+    assert cache.get_state("last_ticket", "last_ticket_downloaded_date") == "2024-01-05T00:00:00.000Z"
+
+    with pytest.raises(LookupError):
+        cache.request("GET", "https://desk.zoho.com/api/v1/tickets")
+
+
+def test_replay_requires_a_recording(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        HttpCache("replay", tmp_path / "missing.sqlite")
@@ -0,0 +1,147 @@
+import pathlib
+import json
+
+import pytest
+
+import utils
+
+
+class FakeS3Client:
+    def __init__(self, fail_on: int = None) -> None:
+        self.objects = {}
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        self.calls += 1
+
+        if self.calls == self.fail_on:
+            raise RuntimeError("upload failed")
+
+        self.objects[Key] = Body
+
+        return {}
+
+
+def write_tickets(path: pathlib.Path) -> None:
+    utils.write_json_file(
+        file_name="tickets_from_1",
+        data=[
+            {"id": 1, "modifiedTime": "2024-01-01T10:00:00.000Z"},
+            {"id": 2, "modifiedTime": "2024-01-02T08:00:00.000Z"},
+            {"id": 3, "modifiedTime": "2024-01-01T23:00:00.000Z"},
+        ],
+        path=path,
+        log_event=False
+    )
+    utils.write_json_file(
+        file_name="tickets_from_2",
+        data=[{"id": 4}],
+        path=path,
+        log_event=False
+    )
+
+
+def manifests(client: FakeS3Client) -> list:
+    return [
+        json.loads(body) for key, body in client.objects.items()
+        if "/_manifests/" in key
+    ]
+
+
+def test_partition_records_by_modified_date():
+    partitions = utils.__partition_records([
+        {"id": 1, "modifiedTime": "2024-01-01T10:00:00.000Z"},
+        {"id": 2, "modifiedTime": "2024-01-02T08:00:00.000Z"},
+        {"id": 3, "modifiedTime": "2024-01-01T23:00:00.000Z"},
+        {"id": 4},
+    ])
+
+    assert {dt: [r["id"] for r in records] for dt, records in partitions.items()} == {
+        "2024-01-01": [1, 3],
+        "2024-01-02": [2],
+        "__HIVE_DEFAULT_PARTITION__": [4],
+    }
+
+
+def test_time_bounds():
+    assert utils.__time_bounds([
+        {"modifiedTime": "2024-01-02T08:00:00.000Z"},
+        {"modifiedTime": "2024-01-01T10:00:00.000Z"},
+        {"id": 3},
+    ]) == ("2024-01-01T10:00:00.000Z", "2024-01-02T08:00:00.000Z")
+
+    assert utils.__time_bounds([{"id": 1}]) == (None, None)
+
+
+def test_send_partitioned_data_writes_ndjson_and_manifest(tmp_path):
+    path = tmp_path / "tickets"
+    write_tickets(path)
+    client = FakeS3Client()
+
+    manifest_key = utils.send_partitioned_data_to_s3(
+        client, path=path, bucket="bucket", key="zohodesk", domain="tickets", org_id="42"
+    )
+
+    assert manifest_key.startswith("zohodesk/_manifests/domain=tickets/org=42/")
+    assert not path.exists()
+
+    [manifest] = manifests(client)
+
+    assert manifest["total_rows"] == 4
+    assert manifest["min_modified_time"] == "2024-01-01T10:00:00.000Z"
+    assert manifest["max_modified_time"] == "2024-01-02T08:00:00.000Z"
+    assert manifest["partitions"] == ["2024-01-01", "2024-01-02", "__HIVE_DEFAULT_PARTITION__"]
+
+    for obj in manifest["objects"]:
+        assert obj["key"].startswith(f"zohodesk/domain=tickets/org=42/dt={obj['dt']}/")
+        assert obj["key"].endswith(".jsonl")
+
+        lines = client.objects[obj["key"]].decode("utf-8").split("\n")
+
+        assert len(lines) == obj["rows"]
+        assert all(isinstance(json.loads(line), dict) for line in lines)
+
+
+def test_send_partitioned_data_retry_overwrites_partial_upload(tmp_path):
+    path = tmp_path / "tickets"
+    write_tickets(path)
+    client = FakeS3Client(fail_on=2)
+
+    with pytest.raises(RuntimeError):
+        utils.send_partitioned_data_to_s3(
+            client, path=path, bucket="bucket", key="zohodesk", domain="tickets", org_id="42"
+        )
+
+    # nothing is lost locally and no manifest lists a partial run
+    assert sorted(f.name for f in path.iterdir()) == ["tickets_from_1.json", "tickets_from_2.json"]
+    assert manifests(client) == []
+
+    partial_keys = set(client.objects)
+    client.fail_on = None
+
+    utils.send_partitioned_data_to_s3(
+        client, path=path, bucket="bucket", key="zohodesk", domain="tickets", org_id="42"
+    )
+
+    [manifest] = manifests(client)
+    data_keys = {key for key in client.objects if "/_manifests/" not in key}
+
+    assert partial_keys <= data_keys
+    assert data_keys == {obj["key"] for obj in manifest["objects"]}
+
+
+def test_send_partitioned_data_skips_empty_folder(tmp_path):
+    path = tmp_path / "tickets"
+    path.mkdir()
+    client = FakeS3Client()
+
+    assert utils.send_partitioned_data_to_s3(
+        client, path=path, bucket="bucket", key="zohodesk", domain="tickets", org_id="42"
+    ) is None
+    assert client.objects == {}
+
+
+def test_send_data_to_s3_requires_org_id_for_partitions(tmp_path):
+    with pytest.raises(ValueError):
+        utils.send_data_to_s3(tmp_path, bucket="bucket", key="zohodesk", domain="tickets")
@@ -0,0 +1,71 @@
+import pathlib
+import json
+
+import pytest
+from requests.models import Response
+
+import http_cache
+from zohodesk import Zohodesk
+
+
+def fake_request(method, url, params=None, headers=None):
+    response = Response()
+    response.status_code = 200
+    response.headers = {"Content-Type": "application/json"}
+
+    if "oauth" in url:
+        data = {"access_token": "real", "refresh_token": "real"}
+    elif url.endswith("/organizations"):
+        data = {"data": [{"companyName": "Company", "id": 7}]}
+    elif "&from=0&" in url:
+        start = url.split("modifiedTimeRange=")[1].split(",")[0]
+        data = {"data": [
+            {"id": 1, "modifiedTime": start},
+            {"id": 2, "modifiedTime": "2024-01-02T00:00:00.000Z"}
+        ]}
+    else:
+        response.status_code = 204
+        data = None
+
+    response._content = b"" if data is None else json.dumps(data).encode("utf-8")
+
+    return response
+
+
+def offline(*args, **kwargs):
+    raise AssertionError("replay must not use the network")
+
+
+def test_replay_right_after_recording(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pathlib.Path("infos.json").write_text(json.dumps({"refresh_token": "real"}))
+    pathlib.Path("last_ticket.json").write_text(
+        json.dumps({"last_ticket_downloaded_date": "2024-01-01T00:00:00.000Z"})
+    )
+
+    monkeypatch.setattr(http_cache.req, "request", fake_request)
+    monkeypatch.setattr("zohodesk.req.request", fake_request)
+
+    with Zohodesk(http_cache_mode="record") as zd:
+        recorded = sorted(f.name for f in zd.get_tickets(upload=False).iterdir())
+
+    pending = pathlib.Path("tickets/tickets_from_pending.json")
+    pending.write_text("[]")
+    local_files = {f: f.read_bytes() for f in tmp_path.rglob("*.json")}
+
+    monkeypatch.setattr(http_cache.req, "request", offline)
+    monkeypatch.setattr("zohodesk.req.request", offline)
+    pathlib.Path("infos.json").unlink()
+    del local_files[tmp_path / "infos.json"]
+
+    for _ in range(2):
+        with Zohodesk(http_cache_mode="replay") as zd:
+            assert sorted(f.name for f in zd.get_tickets(upload=False).iterdir()) == recorded
+
+    # the upload stage runs too, but nothing is sent nor deleted locally
+    with Zohodesk(http_cache_mode="replay") as zd:
+        with pytest.raises(SystemExit):
+            zd.get_tickets()
+
+    assert {f: f.read_bytes() for f in tmp_path.rglob("*.json")} == local_files
+    assert not pathlib.Path("infos.json").exists()
@@ -1,5 +1,7 @@
+from datetime import datetime, timezone
 from typing import Optional
 import pathlib
+import hashlib
 import logging
 import boto3
 import json
@@ -133,19 +135,62 @@ def normalize_json_file(
     return pathlib.Path(save_path)
 
 
+def __partition_records(data: list) -> dict:
+    partitions = {}
+
+    for record in data:
+        modified_time = record.get("modifiedTime") if isinstance(record, dict) else None
+
+        # Hive's convention for rows whose partition value is unknown
+        dt = modified_time[:10] if modified_time else "__HIVE_DEFAULT_PARTITION__"
+
+        partitions.setdefault(dt, []).append(record)
+    
+    return partitions
+
+
+def __time_bounds(data: list) -> tuple:
+    times = [
+        record["modifiedTime"] for record in data
+        if isinstance(record, dict) and record.get("modifiedTime")
+    ]
+
+    if not times:
+        return None, None
+
+    # modifiedTime is ISO 8601 in UTC, so the string order is the time order
+    return min(times), max(times)
+
+
 def send_data_to_s3(
         path: pathlib.Path,
         bucket: str,
-        key: str
+        key: str,
+        domain: Optional[str] = None,
+        org_id: Optional[str] = None,
+        s3_client=None
 ) -> None:
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        aws_session_token=os.getenv('AWS_SESSION_TOKEN')
-    )
-
-    if path.is_dir():
+    if domain is not None and org_id is None:
+        raise ValueError("The organization id is required to send partitioned data to AWS S3.")
+
+    if s3_client is None:
+        s3_client = boto3.client(
+            "s3",
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            aws_session_token=os.getenv('AWS_SESSION_TOKEN')
+        )
+
+    if path.is_dir() and domain is not None:
+        send_partitioned_data_to_s3(
+            s3_client,
+            path=path,
+            bucket=bucket,
+            key=key,
+            domain=domain,
+            org_id=org_id
+        )
+    elif path.is_dir():
         logging.info(f"\nSending the data from '{path}' to AWS S3 '{bucket}/{key}'")
 
         for file in path.iterdir():
@@ -165,6 +210,94 @@ def send_data_to_s3(
         pass
 
 
+def send_partitioned_data_to_s3(
+        s3_client,
+        path: pathlib.Path,
+        bucket: str,
+        key: str,
+        domain: str,
+        org_id: str
+) -> Optional[str]:
+    files = list_and_sort_path(path)
+
+    if not files:
+        logging.info(f"There is no data in '{path}' to send to AWS S3")
+
+        pathlib.Path(path).rmdir()
+
+        return None
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    base_key = f"{key}/domain={domain}/org={org_id}"
+
+    logging.info(f"\nSending the data from '{path}' to AWS S3 '{bucket}/{base_key}' (run {run_id})")
+
+    objects = []
+
+    for file in files:
+        data = read_json_file(file)
+
+        # the key depends only on the file, so sending it again after a failure
+        # overwrites the objects already sent instead of duplicating their rows
+        content_hash = hashlib.sha256(file.read_bytes()).hexdigest()[:16]
+
+        for dt, records in __partition_records(data).items():
+            object_key = f"{base_key}/dt={dt}/{file.stem}_{content_hash}.jsonl"
+            min_time, max_time = __time_bounds(records)
+
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=object_key,
+                # one object per line, as expected by Hive/Athena JSON SerDes
+                Body="\n".join(json.dumps(record) for record in records).encode("utf-8"),
+                ContentType="application/x-ndjson"
+            )
+
+            objects.append({
+                "key": object_key,
+                "dt": dt,
+                "rows": len(records),
+                "min_modified_time": min_time,
+                "max_modified_time": max_time
+            })
+
+    min_times = [obj["min_modified_time"] for obj in objects if obj["min_modified_time"]]
+    max_times = [obj["max_modified_time"] for obj in objects if obj["max_modified_time"]]
+
+    manifest = {
+        "run_id": run_id,
+        "domain": domain,
+        "org": org_id,
+        "bucket": bucket,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "total_rows": sum(obj["rows"] for obj in objects),
+        "min_modified_time": min(min_times) if min_times else None,
+        "max_modified_time": max(max_times) if max_times else None,
+        "partitions": sorted({obj["dt"] for obj in objects}),
+        "objects": objects
+    }
+
+    manifest_key = f"{key}/_manifests/domain={domain}/org={org_id}/{run_id}.json"
+
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=manifest_key,
+        Body=json.dumps(manifest, indent=4).encode("utf-8"),
+        ContentType="application/json"
+    )
+
+    # the local files are only removed once the manifest lists everything that was sent,
+    # so a failed run can be sent again without losing rows
+    for file in files:
+        pathlib.Path(file).unlink()
+    
+    pathlib.Path(path).rmdir()
+
+    logging.info(f"Sending data is finished! Manifest saved at '{bucket}/{manifest_key}'\n")
+
+    return manifest_key
+
+
 def __get_int(n):
     return int(re.search(r'\d+', n.stem).group())
 
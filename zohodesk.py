@@ -5,12 +5,15 @@ from utils import (
     get_infos,
     update_infos
 )
+from http_cache import HttpCache, NullS3Client, REDACTED
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Literal
 import requests as req
+import tempfile
 import logging
 import pathlib
+import shutil
 import json
 import sys
 import os
@@ -30,6 +33,9 @@ class Zohodesk:
     def __init__(
             self,
             code: Optional[str] = None,
+            http_cache_mode: Optional[Literal["record", "replay"]] = None,
+            http_cache_path: str | pathlib.Path = "http_cache.sqlite",
+            replay_latency: float = 0.0
     ) -> None:
         self.base_url: str = "https://desk.zoho.com/api/v1"
         self.token_url: str = "https://accounts.zoho.com/oauth/v2/token"
@@ -38,12 +44,84 @@ class Zohodesk:
         self.code: str = code
         # TODO: increase pattern for date "yyyy-MM-dd'T'HH:mm:ss.SSS'Z'"
         self.__date_pattern = r"2[0-9]{3}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}.[0-9]{3}Z"
+        # "record" saves every response on disk, "replay" serves them back without network
+        self.__http_cache = None if http_cache_mode is None else HttpCache(
+            mode=http_cache_mode,
+            path=http_cache_path,
+            latency=replay_latency,
+            token_url=self.token_url
+        )
+        self.__replaying: bool = http_cache_mode == "replay"
+        # replaying runs the upload stage too, but without sending anything to AWS S3
+        self.__s3_client = NullS3Client() if self.__replaying else None
+        # and writes the extracted data in a scratch folder, so the real local data is never touched
+        self.__replay_dir = pathlib.Path(tempfile.mkdtemp(prefix="zohodesk_replay_")) if self.__replaying else None
         self.__org_id = self.get_organizations().companyId
 
         if "win" in sys.platform:
             from dotenv import load_dotenv
             load_dotenv()
 
+    def __enter__(self) -> "Zohodesk":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.__http_cache is not None:
+            self.__http_cache.close()
+
+        if self.__replay_dir is not None:
+            shutil.rmtree(self.__replay_dir, ignore_errors=True)
+
+    def __data_path(self, path: str) -> pathlib.Path:
+        if self.__replay_dir is None:
+            return pathlib.Path(path).absolute()
+
+        return self.__replay_dir / pathlib.Path(path).name
+
+    def __request(
+            self,
+            method: Literal["GET", "POST"],
+            url: str,
+            params: Optional[dict] = None,
+            headers: Optional[dict] = None
+    ) -> req.Response:
+        if self.__http_cache is None:
+            return req.request(method, url=url, params=params, headers=headers)
+
+        return self.__http_cache.request(method, url=url, params=params, headers=headers)
+
+    def __get_watermark(self, file_name: str, key: str) -> Optional[str]:
+        if self.__replaying:
+            return self.__http_cache.get_state(file_name, key)
+
+        try:
+            value = read_json_file(path=pathlib.Path(f"{file_name}.json").absolute()).get(key)
+        except FileNotFoundError:
+            value = None
+
+        if self.__http_cache is not None:
+            # the replay must start from the same watermark as the recording
+            self.__http_cache.record_state(file_name, key, value)
+
+        return value
+
+    def __set_watermark(self, file_name: str, key: str, value: str) -> None:
+        if self.__replaying:
+            self.__http_cache.set_state(file_name, key, value)
+        elif file_name == "infos":
+            update_infos(key=key, value=value)
+        else:
+            # same folder the watermark is read from (the default path is fixed at import time)
+            write_json_file(
+                file_name=file_name,
+                data={key: value},
+                path=pathlib.Path.cwd(),
+                log_event=False
+            )
+
     def __generate_refresh_token(self) -> None:
         logging.warning("Generating refresh token...")
 
@@ -51,7 +129,8 @@ class Zohodesk:
             raise Exception("Code is needed to get refresh token")
         
         # it must get the code parameter in api console before running
-        response = req.post(
+        response = self.__request(
+            "POST",
             url=self.token_url,
             params={
                 "code": self.code,
@@ -88,9 +167,11 @@ class Zohodesk:
         return get_infos("refresh_token")
     
     def __get_token(self) -> str:
-        refresh_token: str = self.__get_refresh_token()
+        # the recorded token responses are redacted, so no real refresh token is needed to replay
+        refresh_token: str = REDACTED if self.__replaying else self.__get_refresh_token()
 
-        resp = req.post(
+        resp = self.__request(
+            "POST",
             url=self.token_url,
             params={
                 "refresh_token": refresh_token,
@@ -115,7 +196,8 @@ class Zohodesk:
     def get_organizations(self) -> Organizations:
         token = self.__get_token()
 
-        response = req.get(
+        response = self.__request(
+            "GET",
             url=f"{self.base_url}/organizations",
             headers={
                 "Authorization": f"Zoho-oauthtoken {token}"
@@ -154,11 +236,9 @@ class Zohodesk:
                 )
         else:
             # veryfing if already exist downloaded tickets
-            try:
-                file: dict = read_json_file(path=pathlib.Path("last_ticket.json").absolute())
+            start_date = self.__get_watermark("last_ticket", "last_ticket_downloaded_date")
 
-                start_date = file.get("last_ticket_downloaded_date")
-            except FileNotFoundError:
+            if start_date is None:
                 start_date = "2018-01-01T00:00:00.000Z"
         
         today = datetime.today()
@@ -170,7 +250,8 @@ class Zohodesk:
         start: int = 0
 
         for num in range(start, start + 5_000, 100):
-            response = req.get(
+            response = self.__request(
+                "GET",
                 url=f"{self.base_url}/{endpoint}/{parameter}&from={num}&limit=100&sortBy={sort_by}",
                 headers={
                     "orgId": orgId,
@@ -188,39 +269,39 @@ class Zohodesk:
                 final_replaces: str = final.replace(':', '-').replace('T', '_').replace('.000Z', '')
 
                 write_json_file(
-                    path=save_path,
+                    path=self.__data_path(save_path),
                     file_name=f"tickets_from_{init_replaces}_to_{final_replaces}",
                     data=data
                 )
 
-                write_json_file(
-                    file_name="last_ticket",
-                    data={"last_ticket_downloaded_date": f"{final}"},
-                    log_event=False
-                )
+                self.__set_watermark("last_ticket", "last_ticket_downloaded_date", f"{final}")
             elif response.status_code == 204:
                 break
             else:
                 pass
         
-        saved_tickets_path = pathlib.Path("./tickets").absolute()
+        saved_tickets_path = self.__data_path("./tickets")
 
         if upload:
             send_data_to_s3(
                 saved_tickets_path,
                 bucket="501464632998-prod-landing-corporate",
-                key="zohodesk/tickets"
+                key="zohodesk",
+                domain="tickets",
+                org_id=orgId,
+                s3_client=self.__s3_client
             )
 
             if response.status_code == 204:
                 sys.exit()
         else:
-            return pathlib.Path("./tickets").absolute()
+            return self.__data_path("./tickets")
     
     def get_departments(self) -> None:
         token = self.__get_token()
 
-        response = req.get(
+        response = self.__request(
+            "GET",
             url=f"{self.base_url}/departments",
             headers={
                 "Authorization": f"Zoho-oauthtoken {token}"
@@ -230,12 +311,13 @@ class Zohodesk:
         if response.status_code == 200:
             data = json.loads(response.content)['data']
 
-            write_json_file("departamentos", data=data, path="./")
+            write_json_file("departamentos", data=data, path=self.__data_path("./"))
 
     def get_products(self) -> None:
         token = self.__get_token()
 
-        response = req.get(
+        response = self.__request(
+            "GET",
             url=f"{self.base_url}/products",
             headers={
                 "Authorization": f"Zoho-oauthtoken {token}"
@@ -245,7 +327,7 @@ class Zohodesk:
         if response.status_code == 200:
             data = json.loads(response.content)['data']
 
-            write_json_file("produtos", data=data, path="./")
+            write_json_file("produtos", data=data, path=self.__data_path("./"))
 
     def get_tasks(
             self,
@@ -270,11 +352,9 @@ class Zohodesk:
                 )
         else:
             # veryfing if already exist downloaded tickets
-            try:
-                file: dict = read_json_file(path=pathlib.Path("last_task.json").absolute())
+            start_date = self.__get_watermark("last_task", "last_task_downloaded_date")
 
-                start_date = file.get("last_task_downloaded_date")
-            except FileNotFoundError:
+            if start_date is None:
                 start_date = "2018-01-01T00:00:00.000Z"
         
         today = datetime.today()
@@ -286,7 +366,8 @@ class Zohodesk:
         start: int = 0
 
         for num in range(start, start + 5_000, 100):
-            response = req.get(
+            response = self.__request(
+                "GET",
                 url=f"{self.base_url}/{endpoint}/{parameter}&from={num}&limit=100&sortBy={sort_by}",
                 headers={
                     "Authorization": f"Zoho-oauthtoken {token}",
@@ -304,34 +385,33 @@ class Zohodesk:
                 final_replaces: str = final.replace(':', '-').replace('T', '_').replace('.000Z', '')
 
                 write_json_file(
-                    path=save_path,
+                    path=self.__data_path(save_path),
                     file_name=f"tasks_from_{init_replaces}_to_{final_replaces}",
                     data=data
                 )
 
-                write_json_file(
-                    file_name="last_task",
-                    data={"last_task_downloaded_date": f"{final}"},
-                    log_event=False
-                )
+                self.__set_watermark("last_task", "last_task_downloaded_date", f"{final}")
             elif response.status_code == 204:
                 break
             else:
                 pass
         
-        saved_tasks_path = pathlib.Path("./tasks").absolute()
+        saved_tasks_path = self.__data_path("./tasks")
 
         if upload:
             send_data_to_s3(
                 saved_tasks_path,
                 bucket="501464632998-prod-landing-corporate",
-                key="zohodesk/tasks"
+                key="zohodesk",
+                domain="tasks",
+                org_id=orgId,
+                s3_client=self.__s3_client
             )
 
             if response.status_code == 204:
                 sys.exit()
         else:
-            return pathlib.Path("./tasks").absolute()
+            return self.__data_path("./tasks")
     
     def get_contacts(
             self,
@@ -359,11 +439,9 @@ class Zohodesk:
                 )
         else:
             # veryfing if already exist downloaded tickets
-            try:
-                file: dict = read_json_file(path=pathlib.Path(f"last_{domain}.json").absolute())
+            start_date = self.__get_watermark(f"last_{domain}", f"last_{domain}_downloaded_date")
 
-                start_date = file.get(f"last_{domain}_downloaded_date")
-            except FileNotFoundError:
+            if start_date is None:
                 start_date = "2018-01-01T00:00:00.000Z"
         
         today = datetime.today()
@@ -375,7 +453,8 @@ class Zohodesk:
         start: int = 0
 
         for num in range(start, start + 10_000, 100):
-            response = req.get(
+            response = self.__request(
+                "GET",
                 url=f"{self.base_url}/{endpoint}/{parameter}&from={num}&limit=100&sortBy={sort_by}",
                 headers={
                     "Authorization": f"Zoho-oauthtoken {token}",
@@ -393,30 +472,27 @@ class Zohodesk:
                 final_replaces: str = final.replace(':', '-').replace('T', '_').replace('.000Z', '')
 
                 write_json_file(
-                    path=f"./{domain}",
+                    path=self.__data_path(f"./{domain}"),
                     file_name=f"{domain}_from_{init_replaces}_to_{final_replaces}",
                     data=data
                 )
 
-                write_json_file(
-                    file_name=f"last_{domain}",
-                    data={
-                        f"last_{domain}_downloaded_date": f"{final}"
-                    },
-                    log_event=False
-                )
+                self.__set_watermark(f"last_{domain}", f"last_{domain}_downloaded_date", f"{final}")
             elif response.status_code == 204:
                 break
             else:
                 pass
         
-        saved_files_path = pathlib.Path(f"./{domain}").absolute()
+        saved_files_path = self.__data_path(f"./{domain}")
 
         if upload:
             send_data_to_s3(
                 saved_files_path,
                 bucket="501464632998-prod-landing-corporate",
-                key=f"zohodesk/{domain}"
+                key="zohodesk",
+                domain=domain,
+                org_id=orgId,
+                s3_client=self.__s3_client
             )
 
             if response.status_code == 204:
@@ -434,7 +510,7 @@ class Zohodesk:
         token = self.__get_token()
         orgId = self.__org_id if orgId is None else orgId
 
-        start_date = get_infos(f"{domain}_last_downloaded_date")
+        start_date = self.__get_watermark("infos", f"{domain}_last_downloaded_date")
 
         if from_beggining or start_date is None:
             start_date = "2015-01-01T00:00:00.000Z"
@@ -448,7 +524,8 @@ class Zohodesk:
         num: int = 0
 
         while True:
-            response = req.get(
+            response = self.__request(
+                "GET",
                 url=f"{self.base_url}/{endpoint}/{parameter}from=0&limit=100&sortBy={sort_by}",
                 headers={
                     "Authorization": f"Zoho-oauthtoken {token}",
@@ -466,18 +543,21 @@ class Zohodesk:
                 final_replaces: str = final.replace(':', '-').replace('T', '_').replace('.000Z', '')
 
                 write_json_file(
-                    path=f"./{domain}",
+                    path=self.__data_path(f"./{domain}"),
                     file_name=f"{domain}_from_{init_replaces}__to__{final_replaces}",
                     data=data
                 )
 
-                update_infos(key=f"{domain}_last_downloaded_date", value=f"{final}")
+                self.__set_watermark("infos", f"{domain}_last_downloaded_date", f"{final}")
             elif response.status_code == 204:
                 if upload:
                     send_data_to_s3(
-                        pathlib.Path(f"./{domain}").absolute(),
+                        self.__data_path(f"./{domain}"),
                         bucket="501464632998-prod-landing-corporate",
-                        key=f"zohodesk/{domain}"
+                        key="zohodesk",
+                        domain=domain,
+                        org_id=orgId,
+                        s3_client=self.__s3_client
                     )
                 
                 break
@@ -487,9 +567,12 @@ class Zohodesk:
 
             if num == 5_000 and upload:
                 send_data_to_s3(
-                    pathlib.Path(f"./{domain}").absolute(),
+                    self.__data_path(f"./{domain}"),
                     bucket="501464632998-prod-landing-corporate",
-                    key=f"zohodesk/{domain}"
+                    key="zohodesk",
+                    domain=domain,
+                    org_id=orgId,
+                    s3_client=self.__s3_client
                 )
 
                 num = 0